@@ -2,10 +2,10 @@
 # Star Pusher (a Sokoban clone), by Al Sweigart al@inventwithpython.com
 # (Pygame) A puzzle game where you push the stars over their goals.
 import argparse
+import array
 import bz2
-import copy
+import collections
 import hashlib
-import heapq
 import os
 import pickle
 import pygame
@@ -16,6 +16,7 @@ from pygame.locals import *
 
 LEVELSFILE = 'starpusher/levels'  # 'starPusherLevels.txt'
 GAMESTATEFILE = str(os.path.expanduser("~")) + "/.starpusherstate"  # 'starPusherState'
+LEVELCACHEFILE = str(os.path.expanduser("~")) + "/.starpusherlevels"  # parsed level cache
 FPS = 30  # frames per second to update the screen
 WINWIDTH = 800  # width of the program's window, in pixels
 WINHEIGHT = 600  # height in pixels
@@ -30,6 +31,7 @@ TILEFLOORHEIGHT = 40
 KEYDELAY = 300  # keyboard autorepeat parameters
 KEYINTERVAL = 80
 FRAMERATE = 50  # framerate for player automove
+MAXUNDO = 1000  # moves kept per undo/redo stack (bounds the save file size)
 
 # The percentage of outdoor tiles that have additional
 # decoration on them, such as a tree or rock.
@@ -42,6 +44,7 @@ TEXTCOLOR = WHITE
 
 UP = (0, -1)
 DOWN = (0, 1)
+WALL_CHARS = frozenset(('#', 'x'))  # map characters that block movement
 LEFT = (-1, 0)
 RIGHT = (1, 0)
 
@@ -87,7 +90,7 @@ def get_arguments():
 
 
 def main():
-    global FPSCLOCK, DISPLAYSURF, IMAGESDICT, TILEMAPPING, OUTSIDEDECOMAPPING, BASICFONT, PLAYERIMAGES
+    global FPSCLOCK, DISPLAYSURF, IMAGESDICT, TILEMAPPING, OUTSIDEDECOMAPPING, BASICFONT, PLAYERIMAGES, PATHDOTSURF
 
     args = get_arguments()  # get and process command line arguments
 
@@ -102,28 +105,42 @@ def main():
     DISPLAYSURF = pygame.display.set_mode((WINWIDTH, WINHEIGHT), RESIZABLE)
     pygame.display.set_icon(pygame.image.load('starpusher/icon/starpusher.png'))  # change game icon
 
+    # Only the event types the game actually handles are let into the
+    # queue; everything else (focus changes, text input, ...) is
+    # discarded by SDL at the source instead of being built into Python
+    # event objects and skipped in the handler loops.
+    pygame.event.set_blocked(None)  # block everything ...
+    pygame.event.set_allowed([QUIT, KEYDOWN, MOUSEBUTTONDOWN, MOUSEMOTION,
+                              VIDEORESIZE, VIDEOEXPOSE])  # ... except these
+
     pygame.display.set_caption('Star Pusher')
     BASICFONT = pygame.font.Font('freesansbold.ttf', 18)
 
     # A global dict value that will contain all the Pygame
-    # Surface objects returned by pygame.image.load().
-    IMAGESDICT = {'uncovered goal': pygame.image.load('starpusher/images/RedSelector.png'),
-                  'covered goal': pygame.image.load('starpusher/images/Selector.png'),
-                  'star': pygame.image.load('starpusher/images/Star.png'),
-                  'wall': pygame.image.load('starpusher/images/Wood_Block_Tall.png'),
-                  'inside floor': pygame.image.load('starpusher/images/Plain_Block.png'),
-                  'outside floor': pygame.image.load('starpusher/images/Grass_Block.png'),
-                  'title': pygame.image.load('starpusher/images/star_title.png'),
-                  'solved': pygame.image.load('starpusher/images/star_solved.png'),
-                  'princess': pygame.image.load('starpusher/images/princess.png'),
-                  'boy': pygame.image.load('starpusher/images/boy.png'),
-                  'catgirl': pygame.image.load('starpusher/images/catgirl.png'),
-                  'horngirl': pygame.image.load('starpusher/images/horngirl.png'),
-                  'pinkgirl': pygame.image.load('starpusher/images/pinkgirl.png'),
-                  'rock': pygame.image.load('starpusher/images/Rock.png'),
-                  'short tree': pygame.image.load('starpusher/images/Tree_Short.png'),
-                  'tall tree': pygame.image.load('starpusher/images/Tree_Tall.png'),
-                  'ugly tree': pygame.image.load('starpusher/images/Tree_Ugly.png')}
+    # Surface objects returned by pygame.image.load(). The surfaces are
+    # converted to the display pixel format (keeping their alpha channel)
+    # right away, so blits are plain copies instead of per-pixel
+    # conversions every time a tile is drawn.
+    def loadImage(name):
+        return pygame.image.load('starpusher/images/' + name).convert_alpha()
+
+    IMAGESDICT = {'uncovered goal': loadImage('RedSelector.png'),
+                  'covered goal': loadImage('Selector.png'),
+                  'star': loadImage('Star.png'),
+                  'wall': loadImage('Wood_Block_Tall.png'),
+                  'inside floor': loadImage('Plain_Block.png'),
+                  'outside floor': loadImage('Grass_Block.png'),
+                  'title': loadImage('star_title.png'),
+                  'solved': loadImage('star_solved.png'),
+                  'princess': loadImage('princess.png'),
+                  'boy': loadImage('boy.png'),
+                  'catgirl': loadImage('catgirl.png'),
+                  'horngirl': loadImage('horngirl.png'),
+                  'pinkgirl': loadImage('pinkgirl.png'),
+                  'rock': loadImage('Rock.png'),
+                  'short tree': loadImage('Tree_Short.png'),
+                  'tall tree': loadImage('Tree_Tall.png'),
+                  'ugly tree': loadImage('Tree_Ugly.png')}
 
     # These dict values are global, and map the character that appears
     # in the level file to the Surface object it represents.
@@ -135,6 +152,13 @@ def main():
                           '3': IMAGESDICT['tall tree'],
                           '4': IMAGESDICT['ugly tree']}
 
+    # The path preview dot is rasterized once here and blitted per path
+    # tile, instead of re-drawing a circle for every dot on every redraw.
+    dotRadius = TILEFLOORHEIGHT / 3
+    dotSize = int(dotRadius) * 2 + 2
+    PATHDOTSURF = pygame.Surface((dotSize, dotSize), SRCALPHA)
+    pygame.draw.circle(PATHDOTSURF, (150, 150, 150), (dotSize / 2, dotSize / 2), dotRadius, 2)
+
     # PLAYERIMAGES is a list of all possible characters the player can be.
     PLAYERIMAGES = [IMAGESDICT['princess'],
                     IMAGESDICT['boy'],
@@ -157,7 +181,11 @@ def main():
         for filename in args.states:
             with open(filename, 'rb') as f:
                 oldState = f.read()
-            states = pickle.loads(bz2.decompress(oldState))
+            try:
+                states = pickle.loads(oldState)
+            except pickle.UnpicklingError:
+                # state files from older versions were bz2-compressed
+                states = pickle.loads(bz2.decompress(oldState))
             if gameStates:  # further files: copy/overwrite level states
                 for levelHash in states['levels']:
                     gameStates['levels'][levelHash] = states['levels'][levelHash]
@@ -207,8 +235,10 @@ def main():
             gameStateObj['redoStack'] = redoStack
             gameStates['levels'][gameStates['levelHash']] = gameStateObj
         elif result == 'quit':
-            # save game state if changed
-            newState = bz2.compress(pickle.dumps(gameStates))
+            # save game state if changed; the state is a few kilobytes,
+            # so a plain pickle is written instantly - compressing it
+            # with bz2 only added noticeable quit latency
+            newState = pickle.dumps(gameStates, pickle.HIGHEST_PROTOCOL)
             if oldState != newState:
                 print(f"Game state changed, saving...")
                 with open(args.savestates, 'wb') as f:
@@ -219,47 +249,81 @@ def main():
 def runLevel(levels, gameStates):
     levelNum = gameStates['levelNum']
     gameStateObj = gameStates['levels'][gameStates['levelHash']]
+    # Position -> index lookup for the stars, kept in sync by applyMove().
+    # Rebuilt here so game states imported from older save files get one.
+    gameStateObj['starIndex'] = {pos: i for i, pos in enumerate(gameStateObj['stars'])}
+    # Re-wrap the stacks so plain lists from older save files become
+    # bounded deques, too.
+    gameStateObj['undoStack'] = collections.deque(gameStateObj['undoStack'], maxlen=MAXUNDO)
+    gameStateObj['redoStack'] = collections.deque(gameStateObj['redoStack'], maxlen=MAXUNDO)
     levelObj = levels[levelNum]
-    mapObj = decorateMap(levelObj['mapObj'], levelObj['startState']['player'])
+    # Goal bookkeeping for the O(1) isLevelFinished() check; recomputed
+    # here so older save files get it as well.
+    gameStateObj['goalSet'] = frozenset(levelObj['goals'])
+    gameStateObj['goalsRemaining'] = sum(
+        1 for goal in gameStateObj['goalSet'] if goal not in gameStateObj['starIndex'])
+    # The decorated map, wall mask, map size and pre-rendered static
+    # layer only depend on the level, so they are built on first entry
+    # and kept on levelObj: revisiting or resetting a level reuses them
+    # (with the pleasant side effect that the random decorations stay
+    # put instead of being rerolled).
+    if 'staticMapSurf' not in levelObj:
+        levelObj['decoMapObj'] = decorateMap(levelObj['mapObj'], levelObj['startState']['player'])
+        levelObj['wallMask'] = buildWallMask(levelObj['decoMapObj'])  # flat byte mask for the path search
+        levelObj['mapSize'] = getMapSize(levelObj['decoMapObj'])
+        levelObj['staticMapSurf'] = buildStaticSurface(levelObj['decoMapObj'], levelObj['mapSize'])
+    mapObj = levelObj['decoMapObj']
+    wallMask = levelObj['wallMask']
+    mapSize = levelObj['mapSize']
+    staticMapSurf = levelObj['staticMapSurf']
     mapNeedsRedraw = True  # set to True to call drawMap()
     levelSurf = BASICFONT.render(f"Level {levelNum + 1} of {len(levels)}"
                                  f" ({os.path.basename(levels[levelNum]['filename'])} #{levels[levelNum]['lastComment']})",
                                  1, TEXTCOLOR)
     levelRect = levelSurf.get_rect()
 
+    # Bind hot references to locals once; the loop below runs per frame
+    # and each of these would otherwise cost a dict or module lookup.
+    undoStack = gameStateObj['undoStack']
+    redoStack = gameStateObj['redoStack']
+    getEvents = pygame.event.get
+
     levelIsComplete = False
+    lastStepStr = None  # last rendered step counter text and its surface
+    stepSurf = None
     path = None  # steps to go
     showPath = None  # steps to show
     showPathDest = [-1, -1]  # last analyzed destination
     stretchfactor = 1.0  # scale factor if map is bigger than window
 
+    pendingEvents = []  # events woken from the idle wait below
+
     while True:  # main game loop
         # Reset these variables:
         playerMoveTo = []
+        lastMotionPos = None
+        lastResizeSize = None
 
-        for event in pygame.event.get():  # event handling loop
+        for event in pendingEvents + getEvents():  # event handling loop
             if event.type == QUIT:
                 # Player clicked the "X" at the corner of the window.
                 return 'quit'
             elif event.type == VIDEORESIZE:
-                updateWin(event.dict['size'])
-                mapNeedsRedraw = True
+                # a drag-resize queues many of these; only the last
+                # size per frame matters, so just remember it
+                lastResizeSize = event.dict['size']
             elif event.type == VIDEOEXPOSE:  # handles window minimising/maximising
-                updateWin(DISPLAYSURF.get_size())
-                mapNeedsRedraw = True
+                if lastResizeSize is None:
+                    lastResizeSize = DISPLAYSURF.get_size()
             elif (event.type == MOUSEBUTTONDOWN):
                 if event.button == 1:
-                    path = findPath(event.pos, mapObj, gameStateObj, stretchfactor)
+                    path = findPath(event.pos, mapObj, wallMask, gameStateObj, mapSize, stretchfactor)
                 elif event.button == 3:
-                    path = moveStar(event.pos, mapObj, gameStateObj, stretchfactor)
+                    path = moveStar(event.pos, mapObj, gameStateObj, mapSize, stretchfactor)
             elif event.type == MOUSEMOTION:
-                tilePos = mouseToTilePosition(mapObj, event.pos, stretchfactor)
-                if not isSameVector(*showPathDest, *tilePos):
-                    showPathDest = tilePos
-                    newShowPath = a_star_search(tilePos, mapObj, gameStateObj)
-                    if showPath != newShowPath:
-                        showPath = newShowPath
-                        mapNeedsRedraw = True
+                # just remember the position; a fast mouse queues dozens of
+                # motion events per frame and only the last one matters
+                lastMotionPos = event.pos
 
             elif event.type == KEYDOWN:
                 # Handle key presses
@@ -275,18 +339,18 @@ def runLevel(levels, gameStates):
                 elif event.key == K_DOWN:
                     playerMoveTo = DOWN
                 elif event.key == K_u:  # undo
-                    if gameStateObj['undoStack']:
-                        move = gameStateObj['undoStack'].pop()
+                    if undoStack:
+                        move = undoStack.pop()
                         applyMove(gameStateObj, move, undo=True)
-                        gameStateObj['redoStack'].append(move)
+                        redoStack.append(move)
                         levelIsComplete = False  # if level was solved, it is no more
                         showPathDest = [-1, -1]
                         mapNeedsRedraw = True
                 elif event.key == K_r:  # redo
-                    if gameStateObj['redoStack']:
-                        move = gameStateObj['redoStack'].pop()
+                    if redoStack:
+                        move = redoStack.pop()
                         applyMove(gameStateObj, move, undo=False)
-                        gameStateObj['undoStack'].append(move)
+                        undoStack.append(move)
                         if isLevelFinished(levelObj, gameStateObj):
                             # level is solved, we should show the "Solved!" image.
                             levelIsComplete = True
@@ -307,6 +371,22 @@ def runLevel(levels, gameStates):
                     gameStates['currentImage'] = (gameStates['currentImage'] + 1) % len(PLAYERIMAGES)
                     mapNeedsRedraw = True
 
+        if lastResizeSize is not None:
+            # coalesced resize/expose: apply the final size once
+            updateWin(lastResizeSize)
+            mapNeedsRedraw = True
+
+        if lastMotionPos is not None:
+            # coalesced mouse motion: search the preview path at most once
+            # per frame, and only if the mouse moved to a different tile
+            tilePos = mouseToTilePosition(lastMotionPos, mapSize, stretchfactor)
+            if not isSameVector(*showPathDest, *tilePos):
+                showPathDest = tilePos
+                newShowPath = a_star_search(tilePos, mapObj, wallMask, gameStateObj)
+                if showPath != newShowPath:
+                    showPath = newShowPath
+                    mapNeedsRedraw = True
+
         if not levelIsComplete:
             if path is not None and len(path) > 0:
                 step = path.pop()
@@ -330,14 +410,19 @@ def runLevel(levels, gameStates):
         if mapNeedsRedraw:
             mapNeedsRedraw = False
 
-            mapSurf = drawMap(mapObj, gameStateObj, levelObj['goals'], showPath, gameStates['currentImage'])
+            mapSurf = drawMap(staticMapSurf, gameStateObj, levelObj['goals'], showPath, gameStates['currentImage'])
             mapSurfRect = mapSurf.get_rect(center=(HALF_WINWIDTH, HALF_WINHEIGHT))
 
-            # scale if map is bigger than window size
+            # scale if map is bigger than window size; smoothscale is
+            # a pure scaler (SIMD-accelerated where available) and
+            # noticeably faster than rotozoom, which pays for its
+            # rotation support on every output pixel
             stretchfactor = min(WINWIDTH / mapSurfRect.width,
                                 WINHEIGHT / mapSurfRect.height)
             if stretchfactor < 1.0:
-                mapSurf = pygame.transform.rotozoom(mapSurf, 0, stretchfactor)
+                mapSurf = pygame.transform.smoothscale(
+                    mapSurf, (int(mapSurfRect.width * stretchfactor),
+                              int(mapSurfRect.height * stretchfactor)))
                 mapSurfRect = mapSurf.get_rect(center=(HALF_WINWIDTH, HALF_WINHEIGHT))
             else:
                 stretchfactor = 1.0
@@ -351,11 +436,14 @@ def runLevel(levels, gameStates):
             levelRect.bottomleft = (20, WINHEIGHT - 35)
             DISPLAYSURF.blit(levelSurf, levelRect)
 
-            # Draw step counters
+            # Draw step counters; the text only needs re-rendering
+            # when the counters actually changed, not on every redraw
             stepSurfStr = 'Steps: %s, Pushes: %s' % (gameStateObj['stepCounter'], gameStateObj['pushCounter'])
-            if len(gameStateObj['redoStack']) > 0:
-                stepSurfStr += f" (Redo: {len(gameStateObj['redoStack'])})"
-            stepSurf = BASICFONT.render(stepSurfStr, 1, TEXTCOLOR)
+            if len(redoStack) > 0:
+                stepSurfStr += f" (Redo: {len(redoStack)})"
+            if stepSurfStr != lastStepStr:
+                lastStepStr = stepSurfStr
+                stepSurf = BASICFONT.render(stepSurfStr, 1, TEXTCOLOR)
             stepRect = stepSurf.get_rect()
             stepRect.bottomleft = (20, WINHEIGHT - 10)
             DISPLAYSURF.blit(stepSurf, stepRect)
@@ -368,7 +456,20 @@ def runLevel(levels, gameStates):
 
             pygame.display.update()  # draw DISPLAYSURF to the screen.
 
-        FPSCLOCK.tick()
+        pendingEvents = []
+        if not path:
+            # No automove running (path animation paces itself with the
+            # FRAMERATE tick above): instead of spinning at FPS, block
+            # until the next event arrives, like startScreen() does.
+            # Everything that can need work - input, key autorepeat,
+            # resize, expose, quit - comes in as an event; the timeout
+            # is just a watchdog. The woken event is carried into the
+            # next iteration and handled ahead of the fresh batch -
+            # re-posting it would move it behind events that arrived
+            # later and replay inputs out of order.
+            event = pygame.event.wait(1000)
+            if event.type != NOEVENT:
+                pendingEvents = [event]
 
 
 def isWall(mapObj, x, y):
@@ -376,7 +477,7 @@ def isWall(mapObj, x, y):
     the map is a wall, otherwise return False."""
     if x < 0 or x >= len(mapObj) or y < 0 or y >= len(mapObj[x]):
         return False  # x and y aren't actually on the map.
-    elif mapObj[x][y] in ('#', 'x'):
+    elif mapObj[x][y] in WALL_CHARS:
         return True  # wall is blocking
     return False
 
@@ -392,8 +493,10 @@ def decorateMap(mapObj, startxy):
 
     startx, starty = startxy  # Syntactic sugar
 
-    # Copy the map object so we don't modify the original passed
-    mapObjCopy = copy.deepcopy(mapObj)
+    # Copy the map object so we don't modify the original passed.
+    # The cells are 1-character strings (immutable), so copying each
+    # column list is enough -- much cheaper than copy.deepcopy.
+    mapObjCopy = [col[:] for col in mapObj]
 
     # Remove the non-wall characters from the map data
     for x in range(len(mapObjCopy)):
@@ -404,11 +507,21 @@ def decorateMap(mapObj, startxy):
     # Flood fill to determine inside/outside floor tiles.
     floodFill(mapObjCopy, startx, starty, ' ', 'o')
 
-    # decorate outside
-    for x in range(len(mapObjCopy)):
-        for y in range(len(mapObjCopy[0])):
-            if mapObjCopy[x][y] == ' ' and random.randint(0, 99) < OUTSIDE_DECORATION_PCT:
-                mapObjCopy[x][y] = random.choice(list(OUTSIDEDECOMAPPING.keys()))
+    # Decorate the outside tiles, one RNG draw per tile: a draw under
+    # the decoration chance both selects the tile for decoration and,
+    # rescaled, picks which decoration - uniformly, since it is itself
+    # uniform on [0, decoChance). Halves the random calls and drops the
+    # per-tile choice() of the previous version.
+    decoKeys = tuple(OUTSIDEDECOMAPPING)
+    numKeys = len(decoKeys)
+    decoChance = OUTSIDE_DECORATION_PCT / 100
+    rnd = random.random
+    for column in mapObjCopy:
+        for y, character in enumerate(column):
+            if character == ' ':
+                r = rnd()
+                if r < decoChance:
+                    column[y] = decoKeys[int(r / decoChance * numKeys)]
 
     return mapObjCopy
 
@@ -417,16 +530,13 @@ def isBlocked(mapObj, gameStateObj, x, y):
     """Returns True if the (x, y) position on the map is
     blocked by a wall or star, otherwise return False."""
 
-    if isWall(mapObj, x, y):
-        return True
-
-    elif x < 0 or x >= len(mapObj) or y < 0 or y >= len(mapObj[x]):
+    if x < 0 or x >= len(mapObj) or y < 0 or y >= len(mapObj[x]):
         return True  # x and y aren't actually on the map.
 
-    elif (x, y) in gameStateObj['stars']:
-        return True  # a star is blocking
+    elif mapObj[x][y] in WALL_CHARS:
+        return True  # wall is blocking
 
-    return False
+    return (x, y) in gameStateObj['starIndex']  # a star may be blocking
 
 
 def makeMove(mapObj, gameStateObj, playerMoveTo):
@@ -439,9 +549,9 @@ def makeMove(mapObj, gameStateObj, playerMoveTo):
     # Make sure the player can move in the direction they want.
     playerx, playery = gameStateObj['player']
 
-    # This variable is "syntactic sugar". Typing "stars" is more
-    # readable than typing "gameStateObj['stars']" in our code.
-    stars = gameStateObj['stars']
+    # This variable is "syntactic sugar". Typing "starIndex" is more
+    # readable than typing "gameStateObj['starIndex']" in our code.
+    starIndex = gameStateObj['starIndex']
 
     # The code for handling each of the directions is so similar aside
     # from adding or subtracting 1 to the x/y coordinates. We can
@@ -454,22 +564,24 @@ def makeMove(mapObj, gameStateObj, playerMoveTo):
     if isWall(mapObj, playerx + xOffset, playery + yOffset):
         return False
 
-    # a move is a list (1..2) of step lists (xold, yold, xnew, ynew, index)
-    # index is stars index, -1 for player
+    # a move is a list (1..2) of step tuples (xold, yold, xnew, ynew, index)
+    # index is stars index, -1 for player; tuples because steps are
+    # never modified once recorded, and they allocate and pickle
+    # smaller than lists on the undo/redo stacks
     move = []
-    if (playerx + xOffset, playery + yOffset) in stars:
+    if (playerx + xOffset, playery + yOffset) in starIndex:
         # There is a star in the way, see if the player can push it.
         if not isBlocked(mapObj, gameStateObj, playerx + (xOffset * 2), playery + (yOffset * 2)):
             # Move the star.
-            move.append([playerx + xOffset, playery + yOffset,  # old position
+            move.append((playerx + xOffset, playery + yOffset,  # old position
                          playerx + 2 * xOffset, playery + 2 * yOffset,  # new position
-                         stars.index((playerx + xOffset, playery + yOffset))])
+                         starIndex[(playerx + xOffset, playery + yOffset)]))
         else:
             return False
     # Move the player
-    move.append([playerx, playery,  # old position
+    move.append((playerx, playery,  # old position
                  playerx + xOffset, playery + yOffset,  # new position
-                 -1])  # index=-1 for player
+                 -1))  # index=-1 for player
     applyMove(gameStateObj, move)
     gameStateObj['undoStack'].append(move)
     gameStateObj['redoStack'].clear()  # new move, no more redo
@@ -492,8 +604,18 @@ def applyMove(gameStateObj, move, undo=False):
             gameStateObj['player'] = (x, y)
             gameStateObj['stepCounter'] += increment
         else:
+            oldPos = gameStateObj['stars'][index]
+            del gameStateObj['starIndex'][oldPos]
             gameStateObj['stars'][index] = (x, y)
+            gameStateObj['starIndex'][(x, y)] = index
             gameStateObj['pushCounter'] += increment
+            # Only the moved star can change the goal count, so the
+            # level-finished test never has to rescan all goals.
+            goalSet = gameStateObj['goalSet']
+            if oldPos in goalSet:
+                gameStateObj['goalsRemaining'] += 1
+            if (x, y) in goalSet:
+                gameStateObj['goalsRemaining'] -= 1
 
 
 def updateWin(size):
@@ -576,6 +698,18 @@ def startScreen(message):
 
 
 def readLevelsFiles(filenames):
+    # Parsing hundreds of levels takes several Python passes per level;
+    # loading the previously parsed result is a single pickle.load. The
+    # cache is keyed on the file list and modification times.
+    fileStamps = {f: os.path.getmtime(f) for f in filenames if os.path.exists(f)}
+    try:
+        with open(LEVELCACHEFILE, 'rb') as f:
+            cache = pickle.load(f)
+        if cache['fileStamps'] == fileStamps:
+            return cache['levels'], cache['levelHashes']
+    except:
+        pass  # no (valid) cache file: parse the level files
+
     levels = []  # Will contain a list of level objects.
     levelNum = 0
     levelHashes = {}  # dict hash to level number
@@ -625,12 +759,10 @@ def readLevelsFiles(filenames):
                 #     print(f"WARNING: Level {levelNum} file {filename} seems to be identical to level {levelHashes[levelHash]}, hash {levelHash}!")
                 levelHashes[levelHash] = levelNum
 
-                # Convert mapTextLines to a map object, mirroring x and y (landscape screen orientation)
-                for x in range(len(mapTextLines[0])):
-                    mapObj.append([])
-                for y in range(len(mapTextLines)):
-                    for x in range(maxWidth):
-                        mapObj[x].append(mapTextLines[y][x])
+                # Convert mapTextLines to a map object, mirroring x and y
+                # (landscape screen orientation). zip(*lines) transposes the
+                # padded rows in C instead of per-character Python appends.
+                mapObj = [list(col) for col in zip(*mapTextLines)]
 
                 # Loop through the spaces in the map and find the @, ., and $
                 # characters for the starting game state.
@@ -638,16 +770,16 @@ def readLevelsFiles(filenames):
                 starty = None
                 goals = []  # list of (x, y) tuples for each goal.
                 stars = []  # list of (x, y) for each star's starting position.
-                for x in range(maxWidth):
-                    for y in range(len(mapObj[x])):
-                        if mapObj[x][y] in ('@', '+'):
+                for y, line in enumerate(mapTextLines):
+                    for x, character in enumerate(line):
+                        if character in ('@', '+'):
                             # '@' is player, '+' is player & goal
                             startx = x
                             starty = y
-                        if mapObj[x][y] in ('.', '+', '*'):
+                        if character in ('.', '+', '*'):
                             # '.' is goal, '*' is star & goal
                             goals.append((x, y))
-                        if mapObj[x][y] in ('$', '*'):
+                        if character in ('$', '*'):
                             # '$' is star
                             stars.append((x, y))
 
@@ -683,50 +815,66 @@ def readLevelsFiles(filenames):
                 levelNumInFile += 1
                 levelNum += 1
 
+    try:
+        with open(LEVELCACHEFILE, 'wb') as f:
+            pickle.dump({'fileStamps': fileStamps, 'levels': levels, 'levelHashes': levelHashes},
+                        f, pickle.HIGHEST_PROTOCOL)
+    except OSError:
+        pass  # the cache is only an optimization, play on without it
+
     return levels, levelHashes
 
 
 def floodFill(mapObj, x, y, oldCharacter, newCharacter):
     """Changes any values matching oldCharacter on the map object to
     newCharacter at the (x, y) position, and does the same for the
-    positions to the left, right, down, and up of (x, y), recursively."""
+    positions to the left, right, down, and up of (x, y)."""
 
     # In this game, the flood fill algorithm creates the inside/outside
-    # floor distinction. This is a "recursive" function.
+    # floor distinction. The fill is done iteratively with an explicit
+    # stack of seed positions, so large levels can neither hit Python's
+    # recursion limit nor pay the per-cell call frame overhead.
     # For more info on the Flood Fill algorithm, see:
     #   http://en.wikipedia.org/wiki/Flood_fill
-    if mapObj[x][y] == oldCharacter:
+    stack = collections.deque([(x, y)])
+    while stack:
+        x, y = stack.pop()
+        if mapObj[x][y] != oldCharacter:
+            continue
         mapObj[x][y] = newCharacter
 
-    if x < len(mapObj) - 1 and mapObj[x + 1][y] == oldCharacter:
-        floodFill(mapObj, x + 1, y, oldCharacter, newCharacter)  # call right
-    if x > 0 and mapObj[x - 1][y] == oldCharacter:
-        floodFill(mapObj, x - 1, y, oldCharacter, newCharacter)  # call left
-    if y < len(mapObj[x]) - 1 and mapObj[x][y + 1] == oldCharacter:
-        floodFill(mapObj, x, y + 1, oldCharacter, newCharacter)  # call down
-    if y > 0 and mapObj[x][y - 1] == oldCharacter:
-        floodFill(mapObj, x, y - 1, oldCharacter, newCharacter)  # call up
+        if x < len(mapObj) - 1:
+            stack.append((x + 1, y))  # check right
+        if x > 0:
+            stack.append((x - 1, y))  # check left
+        if y < len(mapObj[x]) - 1:
+            stack.append((x, y + 1))  # check down
+        if y > 0:
+            stack.append((x, y - 1))  # check up
 
 
-def drawMap(mapObj, gameStateObj, goals, showPath, currentImage):
-    """Draws the map to a Surface object, including the player, stars,
-     and an optional path. This function does not call pygame.display.update(),
-     nor does it draw the "Level" and "Steps" text in the corner.
-    """
+def tileRect(x, y):
+    """Returns the pixel Rect of the (x, y) tile on the map surface."""
+    return pygame.Rect((x * TILEWIDTH, y * TILEFLOORHEIGHT, TILEWIDTH, TILEHEIGHT))
+
 
-    if showPath is None:
-        showPath = []
+def buildStaticSurface(mapObj, mapSize):
+    """Draws everything that never changes during play - the floor, wall
+    and decoration tiles - to a new Surface object and returns it.
+    drawMap() blits the dynamic sprites on a copy of this surface, so the
+    full per-tile loop runs only once per level instead of per redraw."""
 
     # mapSurf will be the single Surface object that the tiles are drawn
     # on, so that it is easy to position the entire map on the DISPLAYSURF
-    # Surface object. First, the width and height must be calculated.
-    mapSurf = pygame.Surface(getMapSize(mapObj))
+    # Surface object. The caller passes the precomputed pixel size.
+    mapSurf = pygame.Surface(mapSize)
     mapSurf.fill(BGCOLOR)  # start with a blank color on the surface.
 
-    # Draw the tile sprites onto this surface.
+    # Collect the tile sprites to draw onto this surface.
+    blitList = []
     for x in range(len(mapObj)):
         for y in range(len(mapObj[x])):
-            spaceRect = pygame.Rect((x * TILEWIDTH, y * TILEFLOORHEIGHT, TILEWIDTH, TILEHEIGHT))
+            spaceRect = tileRect(x, y)
             if mapObj[x][y] in TILEMAPPING:
                 baseTile = TILEMAPPING[mapObj[x][y]]
             elif mapObj[x][y] in OUTSIDEDECOMAPPING:
@@ -734,60 +882,100 @@ def drawMap(mapObj, gameStateObj, goals, showPath, currentImage):
             else:
                 raise ValueError("unexpected map tile")  # can't happen, just to get rid of warning
 
-            # First draw the base ground/wall tile.
-            mapSurf.blit(baseTile, spaceRect)
+            # First the base ground/wall tile.
+            blitList.append((baseTile, spaceRect))
 
             if mapObj[x][y] in OUTSIDEDECOMAPPING:
-                # Draw any tree/rock decorations that are on this tile.
-                mapSurf.blit(OUTSIDEDECOMAPPING[mapObj[x][y]], spaceRect)
-            elif (x, y) in gameStateObj['stars']:
-                if (x, y) in goals:
-                    # A goal AND star are on this space, draw goal first.
-                    mapSurf.blit(IMAGESDICT['covered goal'], spaceRect)
-                # Then draw the star sprite.
-                mapSurf.blit(IMAGESDICT['star'], spaceRect)
-            elif (x, y) in goals:
-                # Draw a goal without a star on it.
-                mapSurf.blit(IMAGESDICT['uncovered goal'], spaceRect)
-
-            if (x, y) in showPath:
-                pygame.draw.circle(mapSurf, (150, 150, 150),
-                                   (x * TILEWIDTH + TILEWIDTH / 2,
-                                    y * TILEFLOORHEIGHT + (TILEHEIGHT - TILEFLOORHEIGHT) / 2 + 5 + TILEFLOORHEIGHT / 2),
-                                   TILEFLOORHEIGHT / 3, 2)
-
-            # Last draw the player on the board.
-            if (x, y) == gameStateObj['player']:
-                # Note: The value "currentImage" refers
-                # to a key in "PLAYERIMAGES" which has the
-                # specific player image we want to show.
-                mapSurf.blit(PLAYERIMAGES[currentImage], spaceRect)
+                # Then any tree/rock decorations that are on this tile.
+                blitList.append((OUTSIDEDECOMAPPING[mapObj[x][y]], spaceRect))
+
+    # One C-level call blits the whole list in order, saving a
+    # Python/C transition per tile.
+    mapSurf.blits(blitList, doreturn=0)
+
+    # The surface is opaque (filled with BGCOLOR), so convert it to the
+    # display format: the per-redraw copy() in drawMap and the final
+    # blit to DISPLAYSURF both become straight memory copies.
+    return mapSurf.convert()
+
+
+def drawMap(staticMapSurf, gameStateObj, goals, showPath, currentImage):
+    """Draws the dynamic sprites - goals, stars, the optional path and the
+     player - on a copy of the static map surface and returns it.
+     This function does not call pygame.display.update(),
+     nor does it draw the "Level" and "Steps" text in the corner.
+    """
+
+    mapSurf = staticMapSurf.copy()
+    starIndex = gameStateObj['starIndex']
+
+    # Batch the goal and star sprites into a single blits() call; the
+    # sprite surfaces are looked up once, not per goal.
+    coveredGoal = IMAGESDICT['covered goal']
+    uncoveredGoal = IMAGESDICT['uncovered goal']
+    starImage = IMAGESDICT['star']
+    blitList = []
+    for x, y in goals:
+        if (x, y) in starIndex:
+            # A star is on this goal; the star itself is drawn below.
+            blitList.append((coveredGoal, tileRect(x, y)))
+        else:
+            # A goal without a star on it.
+            blitList.append((uncoveredGoal, tileRect(x, y)))
+
+    for x, y in gameStateObj['stars']:
+        blitList.append((starImage, tileRect(x, y)))
+
+    mapSurf.blits(blitList, doreturn=0)
+
+    if showPath:
+        mapSurf.blits([(PATHDOTSURF, PATHDOTSURF.get_rect(
+            center=(x * TILEWIDTH + TILEWIDTH / 2,
+                    y * TILEFLOORHEIGHT + (TILEHEIGHT - TILEFLOORHEIGHT) / 2 + 5 + TILEFLOORHEIGHT / 2)))
+            for x, y in showPath], doreturn=0)
+
+    # Last draw the player on the board.
+    # Note: The value "currentImage" refers
+    # to a key in "PLAYERIMAGES" which has the
+    # specific player image we want to show.
+    mapSurf.blit(PLAYERIMAGES[currentImage], tileRect(*gameStateObj['player']))
 
     return mapSurf
 
 
 def isLevelFinished(levelObj, gameStateObj):
-    """Returns True if all the goals have stars in them."""
-    for goal in levelObj['goals']:
-        if goal not in gameStateObj['stars']:
-            # Found a space with a goal but no star on it.
-            return False
-    return True
+    """Returns True if all the goals have stars in them. applyMove()
+    keeps the goalsRemaining counter up to date, so this is a plain
+    integer comparison instead of a scan over all goals."""
+    return gameStateObj['goalsRemaining'] == 0
 
 
 def initGameState(levels, currentLevelIndex):
     """Initialize the game state at the start of a new level.
     Returns gameStateObj."""
-    gameStateObj = copy.deepcopy(levels[currentLevelIndex]['startState'])
+    # startState is {'player': (x, y), 'stars': [(x, y), ...]}. The
+    # positions are immutable tuples, so cloning the stars list is the
+    # only copy needed - no deepcopy machinery.
+    startState = levels[currentLevelIndex]['startState']
+    gameStateObj = {'player': startState['player'],
+                    'stars': list(startState['stars'])}
+    gameStateObj['starIndex'] = {pos: i for i, pos in enumerate(gameStateObj['stars'])}
+    # Goals the stars have not covered yet, maintained incrementally by
+    # applyMove() so isLevelFinished() is a single comparison.
+    gameStateObj['goalSet'] = frozenset(levels[currentLevelIndex]['goals'])
+    gameStateObj['goalsRemaining'] = sum(
+        1 for goal in gameStateObj['goalSet'] if goal not in gameStateObj['starIndex'])
     gameStateObj['stepCounter'] = 0
     gameStateObj['pushCounter'] = 0
-    gameStateObj['undoStack'] = []  # both list of move list of step list
-    gameStateObj['redoStack'] = []
+    # both are stacks of moves (a move is a list of step lists); bounded
+    # deques drop the oldest entries instead of growing without limit
+    gameStateObj['undoStack'] = collections.deque(maxlen=MAXUNDO)
+    gameStateObj['redoStack'] = collections.deque(maxlen=MAXUNDO)
     return gameStateObj
 
 
-def moveStar(winPos, mapObj, gameStateObj, stretchfactor):
-    dest = mouseToTilePosition(mapObj, winPos, stretchfactor)
+def moveStar(winPos, mapObj, gameStateObj, mapSize, stretchfactor):
+    dest = mouseToTilePosition(winPos, mapSize, stretchfactor)
     src = gameStateObj['player']
     path = []
     dx = dy = 0
@@ -805,7 +993,7 @@ def moveStar(winPos, mapObj, gameStateObj, stretchfactor):
         return None  # neither same row nor column
     px = src[0] + dx  # start search position
     py = src[1] + dy
-    if (px, py) not in gameStateObj['stars']:
+    if (px, py) not in gameStateObj['starIndex']:
         return None  # next tile must be star
     if (dest[0], dest[1]) == (px, py):
         return None  # next tile must not be destination
@@ -820,21 +1008,50 @@ def moveStar(winPos, mapObj, gameStateObj, stretchfactor):
             return path
 
 
-def findPath(winPos, mapObj, gameStateObj, stretchfactor):
-    tilePos = mouseToTilePosition(mapObj, winPos, stretchfactor)
-    return a_star_search(tilePos, mapObj, gameStateObj)
+def findPath(winPos, mapObj, wallMask, gameStateObj, mapSize, stretchfactor):
+    tilePos = mouseToTilePosition(winPos, mapSize, stretchfactor)
+    return a_star_search(tilePos, mapObj, wallMask, gameStateObj)
 
 
-def mouseToTilePosition(mapObj, winPos, stretchfactor):
+def mouseToTilePosition(winPos, mapSize, stretchfactor,
+                        _TW=TILEWIDTH, _TFH=TILEFLOORHEIGHT, _TH=TILEHEIGHT):
+    # mapSize is computed once per level in runLevel(); the upper left
+    # corner still depends on the current window size, but deriving it
+    # from the cached size is just a couple of additions. The tile
+    # constants are bound as default arguments so the per-event lookups
+    # are fast locals; the HALF_WIN* values change on window resize and
+    # therefore have to stay module globals. All map-side arithmetic is
+    # integer-only (matching the int rect coordinates the map is
+    # actually drawn at); floats only appear in the stretch correction.
     if 0.0 < stretchfactor < 1.0:  # if map stretched
         # calc virtual mouse position as if it was not stretched
         winPos = (HALF_WINWIDTH + (winPos[0] - HALF_WINWIDTH) / stretchfactor,
                   HALF_WINHEIGHT + (winPos[1] - HALF_WINHEIGHT) / stretchfactor)
-    mapWidth, mapHeight = getMapSize(mapObj)
-    mapUpperLeft = (HALF_WINWIDTH - mapWidth / 2,
-                    HALF_WINHEIGHT - mapHeight / 2 + (TILEHEIGHT - TILEFLOORHEIGHT) / 2 + 5)
-    mapPos = (winPos[0] - mapUpperLeft[0], winPos[1] - mapUpperLeft[1])
-    return int(mapPos[0] // TILEWIDTH), int(mapPos[1] // TILEFLOORHEIGHT)
+    mapWidth, mapHeight = mapSize
+    upperLeftX = HALF_WINWIDTH - (mapWidth >> 1)
+    upperLeftY = HALF_WINHEIGHT - (mapHeight >> 1) + ((_TH - _TFH) >> 1) + 5
+    return (int((winPos[0] - upperLeftX) // _TW),
+            int((winPos[1] - upperLeftY) // _TFH))
+
+
+def buildWallMask(mapObj):
+    """Returns a flat bytearray marking the wall tiles, padded with a
+    one-tile border of walls on all sides and indexed by
+    (x + 1) * (height + 2) + (y + 1). The rendering code keeps the
+    list-of-lists map; the search uses this mask so a neighbour test is
+    one integer-indexed byte load, and thanks to the sentinel border it
+    needs no bounds checks at all. Built once per level by runLevel()."""
+    padHeight = len(mapObj[0]) + 2
+    wallMask = bytearray(b'\x01') * ((len(mapObj) + 2) * padHeight)
+    idx = padHeight  # skip the left border column
+    for column in mapObj:
+        idx += 1  # top border tile
+        for character in column:
+            if character not in WALL_CHARS:
+                wallMask[idx] = 0
+            idx += 1
+        idx += 1  # bottom border tile
+    return wallMask
 
 
 def getMapSize(mapObj):
@@ -843,15 +1060,11 @@ def getMapSize(mapObj):
     return mapWidth, mapHeight
 
 
-# from https://www.geeksforgeeks.org/a-search-algorithm/
-# Define the Cell class
-class Cell:
-    def __init__(self):
-        self.parent_i = 0  # Parent cell's row index
-        self.parent_j = 0  # Parent cell's column index
-        self.f = sys.maxsize  # Total cost of the cell (g + h)
-        self.g = sys.maxsize  # Cost from start to this cell
-        self.h = 0  # Heuristic cost from this cell to destination
+# Scratch buffers for a_star_search, reused across calls so a mouse
+# hover does not reallocate four map-sized arrays per search. They are
+# (re)sized when the map dimensions change; the *_reset entries are
+# prefilled templates copied in with one C-level slice assignment.
+search_scratch = {'size': -1}
 
 
 # Check if two vectors (2-dim list) are identical
@@ -859,95 +1072,194 @@ def isSameVector(x1, y1, x2, y2):
     return x1 == x2 and y1 == y2
 
 
-# Trace the path from source to destination
-def trace_path(cell_details, dest):
-    path = []
-    row = dest[0]
-    col = dest[1]
-
-    # Trace the path from destination to source using parent cells
-    while not (cell_details[row][col].parent_i == row and cell_details[row][col].parent_j == col):
-        path.append((row, col))
-        temp_row = cell_details[row][col].parent_i
-        temp_col = cell_details[row][col].parent_j
-        row = temp_row
-        col = temp_col
-
-    # Add the source cell to the path
-    path.append((row, col))
-    # Reverse the path to get the path from source to destination
-    # path.reverse()  # already done by using pop()
+# Trace the path from source to destination, translating the padded
+# search coordinates back to map coordinates. All edges cost 1, so the
+# destination's g value gives the exact path length up front and the
+# list is allocated once instead of grown append by append.
+def trace_path(parent, padHeight, dest_idx, length):
+    path = [None] * length
+    idx = dest_idx
+
+    # Walk the parent cells from destination to source; the caller
+    # consumes the path with pop(), so destination-first order is the
+    # inverted order it wants and no reverse() is needed.
+    for k in range(length):
+        path[k] = (idx // padHeight - 1, idx % padHeight - 1)
+        idx = parent[idx]
     return path
 
 
 # Implement the A* search algorithm
-def a_star_search(dest, mapObj, gameStateObj):
+def a_star_search(dest, mapObj, wallMask, gameStateObj):
     src = gameStateObj['player']
+    starIndex = gameStateObj['starIndex']
     mapWidth = len(mapObj)
-    mapHeight = (len(mapObj[0]) - 1)
+    mapHeight = len(mapObj[0])
 
     if (isBlocked(mapObj, gameStateObj, *dest)  # destination tile blocked or invalid
             or isSameVector(*src, *dest)):  # already there
         return None
 
-    # Initialize the closed list (visited cells)
-    closed_list = [[False for _ in range(mapHeight)] for _ in range(mapWidth)]
-    # Initialize the details of each cell
-    cell_details = [[Cell() for _ in range(mapHeight)] for _ in range(mapWidth)]
-
-    # Initialize the start cell details
-    i = src[0]
-    j = src[1]
-    cell_details[i][j].f = 0
-    cell_details[i][j].g = 0
-    cell_details[i][j].h = 0
-    cell_details[i][j].parent_i = i
-    cell_details[i][j].parent_j = j
-
-    # Initialize the open list (cells to be visited) with the start cell
-    open_list = []
-    heapq.heappush(open_list, (0, i, j))
+    # Per-cell search state lives in flat arrays using the same padded
+    # indexing as the wall mask: (x + 1) * padHeight + (y + 1). Compared
+    # with a grid of cell objects this avoids W*H allocations per search
+    # and turns every attribute access into a plain integer-indexed
+    # load/store. Instead of clearing the arrays per call, a generation
+    # counter marks what is current: a cell was touched by this search
+    # iff gen[idx] >= search_id, and closed iff gen[idx] == search_id+1
+    # (lazy clearing - stale f/g/parent/h values are simply never read).
+    size = (mapWidth + 2) * (mapHeight + 2)
+    if search_scratch['size'] != size:
+        search_scratch['size'] = size
+        search_scratch['zero_reset'] = bytes(size)
+        search_scratch['gen'] = array.array('q', [-1]) * size
+        search_scratch['search_id'] = 0
+        search_scratch['f'] = array.array('q', [0]) * size
+        search_scratch['g'] = array.array('q', [0]) * size
+        search_scratch['parent'] = array.array('l', [-1]) * size
+        search_scratch['h'] = array.array('l', [-1]) * size
+        search_scratch['blocked'] = bytearray(size)
+        search_scratch['reach'] = bytearray(size)
+        search_scratch['reach_mask'] = None  # reach/blocked now stale
+        search_scratch['buckets'] = []
+
+    # Reachability cache: a flood fill from the player over the blocked
+    # mask, redone only when the player or a star has moved (or the
+    # level changed). While hovering between moves, queries for the
+    # many unreachable tiles of a walled-off Sokoban board then cost a
+    # single byte load instead of a full A* expansion of the player's
+    # component. The blocked mask - static walls (border included)
+    # combined with the star positions - is rebuilt together with it,
+    # so the A* successor test below stays a single byte load too.
+    blocked = search_scratch['blocked']
+    reach = search_scratch['reach']
+    padHeight = mapHeight + 2
+    reach_key = (src, tuple(gameStateObj['stars']))
+    if (search_scratch['reach_mask'] is not wallMask
+            or search_scratch['reach_key'] != reach_key):
+        blocked[:] = wallMask
+        for star_x, star_y in starIndex:
+            blocked[(star_x + 1) * padHeight + star_y + 1] = 1
+        reach[:] = search_scratch['zero_reset']
+        start = (src[0] + 1) * padHeight + src[1] + 1
+        reach[start] = 1
+        stack = [start]
+        while stack:
+            cell = stack.pop()
+            for nidx in (cell + 1, cell - 1, cell + padHeight, cell - padHeight):
+                if not blocked[nidx] and not reach[nidx]:
+                    reach[nidx] = 1
+                    stack.append(nidx)
+        search_scratch['reach_mask'] = wallMask
+        search_scratch['reach_key'] = reach_key
+    if not reach[(dest[0] + 1) * padHeight + dest[1] + 1]:
+        return None  # destination provably unreachable, skip the search
+
+    # Bump the generation; everything the previous searches wrote is
+    # now stale without touching a single array element. sid marks
+    # "seen this search", sid + 1 marks "closed this search".
+    sid = search_scratch['search_id'] + 2
+    search_scratch['search_id'] = sid
+    gen = search_scratch['gen']
+    f = search_scratch['f']  # total cost (g + h)
+    g = search_scratch['g']  # cost from start
+    parent = search_scratch['parent']  # parent cell index
+    # Heuristic memo, filled on first touch per search. Values depend
+    # only on the destination, but a cell gets relaxed once per parent
+    # it is reached from, so each cell's heuristic is computed at most
+    # once (the Manhattan distance - admissible and consistent on a
+    # 4-connected unit grid, so a closed cell is final).
+    h_cache = search_scratch['h']
+
+    # Initialize the start cell details (padded coordinates)
+    i = src[0] + 1
+    j = src[1] + 1
+    dest_i = dest[0] + 1
+    dest_j = dest[1] + 1
+    dest_idx = dest_i * padHeight + dest_j
+    idx = i * padHeight + j
+    gen[idx] = sid
+    f[idx] = 0
+    g[idx] = 0
+    parent[idx] = idx
+
+    # The open list is a monotone bucket queue (Dial's algorithm): all
+    # edge costs are 1 and the Manhattan heuristic is consistent, so the
+    # popped f values never decrease and fit a small integer range.
+    # buckets[fval] holds the queued cell indices with that f value;
+    # push and pop are O(1) appends/pops with no comparisons at all.
+    buckets = search_scratch['buckets']
+    for bucket in buckets:
+        if bucket:
+            bucket.clear()  # leftovers from an early-terminated search
+    if not buckets:
+        buckets.append([])
+    buckets[0].append(idx)
+    queued = 1
+    cur_f = 0
 
     # Main loop of A* search algorithm
-    while len(open_list) > 0:
-        # Pop the cell with the smallest f value from the open list
-        p = heapq.heappop(open_list)
-
-        # Mark the cell as visited
-        i = p[1]
-        j = p[2]
-        closed_list[i][j] = True
-
-        # For each direction, check the successors
-        for direction in [(0, 1), (0, -1), (1, 0), (-1, 0)]:
-            new_i = i + direction[0]
-            new_j = j + direction[1]
-
-            # If the successor is valid, unblocked, and not visited
-            if not isBlocked(mapObj, gameStateObj, new_i, new_j) and not closed_list[new_i][new_j]:
-                # If the successor is the destination
-                if isSameVector(new_i, new_j, *dest):
-                    # Set the parent of the destination cell
-                    cell_details[new_i][new_j].parent_i = i
-                    cell_details[new_i][new_j].parent_j = j
-                    # Trace and print the path from source to destination
-                    return trace_path(cell_details, dest)
+    while queued:
+        # Pop a cell with the smallest f value from the open list.
+        # Pushes never go below the current f, so the cursor only moves
+        # forward. Popping the newest entry of the bucket (LIFO) is a
+        # deliberate tie-break: within one f value the most recently
+        # pushed cells have the highest g (lowest h), so the search
+        # digs toward the destination through the final f layer
+        # instead of sweeping the whole equal-f diamond.
+        while not buckets[cur_f]:
+            cur_f += 1
+        idx = buckets[cur_f].pop()
+        queued -= 1
+        if gen[idx] != sid or f[idx] != cur_f:
+            continue  # stale entry, superseded by a cheaper push
+
+        # Terminate when the destination is popped, not when it is
+        # first generated: with a consistent heuristic its g is final
+        # only once it leaves the open list, so this guarantees the
+        # returned path is a shortest one.
+        if idx == dest_idx:
+            return trace_path(parent, padHeight, idx, g[idx] + 1)
+
+        # Mark the cell as closed and read its g cost once; every
+        # successor reuses it
+        gen[idx] = sid + 1
+        g_new = g[idx] + 1  # way to any successor
+
+        # Check the four successors. In the flat padded layout they sit
+        # at fixed offsets, so no per-direction coordinate arithmetic or
+        # tuple unpacking is needed.
+        for new_idx in (idx + 1, idx - 1, idx + padHeight, idx - padHeight):
+            # If the successor is unblocked (the sentinel border makes
+            # off-map neighbours read as walls) and not closed
+            if not blocked[new_idx] and gen[new_idx] != sid + 1:
+                if gen[new_idx] == sid:
+                    # Seen before in this search: relax if cheaper
+                    f_new = g_new + h_cache[new_idx]
+                    if f[new_idx] > f_new:
+                        f[new_idx] = f_new
+                        g[new_idx] = g_new
+                        parent[new_idx] = idx
+                        # Add the cell to its f bucket; the remaining
+                        # entry under the old f is skipped as stale
+                        # when popped.
+                        buckets[f_new].append(new_idx)
+                        queued += 1
                 else:
-                    # Calculate the new f, g, and h values
-                    g_new = cell_details[i][j].g + 1  # way to successor so far
-                    h_new = abs(new_i - dest[0]) + abs(new_j - dest[1])  # minimum way to dest (no diagonals)
+                    # First touch this search: compute the heuristic
+                    # and enqueue unconditionally
+                    new_i, new_j = divmod(new_idx, padHeight)
+                    h_new = abs(new_i - dest_i) + abs(new_j - dest_j)  # minimum way to dest (no diagonals)
+                    h_cache[new_idx] = h_new
                     f_new = g_new + h_new  # minimum total way
-
-                    # If the cell is not in the open list or the new f value is smaller
-                    if cell_details[new_i][new_j].f > f_new:
-                        # Add the cell to the open list
-                        heapq.heappush(open_list, (f_new, new_i, new_j))
-                        # Update the cell details
-                        cell_details[new_i][new_j].f = f_new
-                        cell_details[new_i][new_j].g = g_new
-                        cell_details[new_i][new_j].h = h_new
-                        cell_details[new_i][new_j].parent_i = i
-                        cell_details[new_i][new_j].parent_j = j
+                    gen[new_idx] = sid
+                    f[new_idx] = f_new
+                    g[new_idx] = g_new
+                    parent[new_idx] = idx
+                    while len(buckets) <= f_new:
+                        buckets.append([])
+                    buckets[f_new].append(new_idx)
+                    queued += 1
 
     # If the destination is not found after visiting all cells
     return None